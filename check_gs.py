@@ -5,73 +5,447 @@ A script that rewrites all PDFs in the store with GhostScript and checks
 whether any errors/warnings were emitted.
 """
 
+import atexit
+import hashlib
+import json
+import re
+import shlex
+import shutil
 import subprocess
 import sys
-from pathlib import Path
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import threading
+import time
+import multiprocessing
 import os
+import queue
 
+PDF_DIR = "store/"
 
-def process_pdf(pdf_path, gs_bin):
-    print(f"Processing: {pdf_path}")
+# Records which PDFs passed with which gs version and flags, so that unchanged
+# PDFs don't need to be checked again.
+CACHE_PATH = ".check_gs_cache.json"
+
+# Bump this whenever the way PDFs are checked changes, so that passes recorded by
+# an older version of this script aren't reused.
+CACHE_VERSION = 1
+
+# Printed by gs after each file, so that we know where the output of one file ends.
+SENTINEL = "__CHECK_GS_DONE__"
+
+ERROR_RE = re.compile("error", re.IGNORECASE)
+
+# The number of files checked by a single gs process. pdfwrite combines all of
+# them into one output document, which is only finalized when gs quits, so this
+# also bounds how much gs keeps in memory.
+BATCH_SIZE = 8
+
+# Some broken PDFs make gs loop forever, so give up on a file after a time
+# proportional to its size.
+MIN_TIMEOUT = 30
+TIMEOUT_PER_MB = float(os.environ.get("GS_TIMEOUT_PER_MB", 10))
+
+# The gs process owned by the current worker, started anew for each batch, and
+# the lines of its output.
+_gs_bin = None
+_gs = None
+_gs_lines = None
+
+# The workers are shared by all calls to `main`, so that repeated runs don't pay
+# for spawning them again. They are tied to the gs binary they were started with.
+_workers = None
+
+
+def _worker(gs_bin, cpu, tasks, results):
+    global _gs_bin
+    _gs_bin = gs_bin
+
+    if cpu is not None:
+        # Give each worker its own CPU. The gs process started by the worker
+        # inherits the affinity, so workers don't compete with each other.
+        os.sched_setaffinity(0, {cpu})
 
     try:
-        result = subprocess.run(
-            [
-                gs_bin,
-                "-sDEVICE=pdfwrite",
-                "-dNOPAUSE",
-                "-dBATCH",
-                "-sOutputFile=/dev/null",
-                str(pdf_path),
-            ],
-            capture_output=True,
-            text=True,
-        )
-
-        output = result.stdout + result.stderr
-
-        if "error" in output.lower():
-            print(output)
-            return (pdf_path, False)
-
-        return (pdf_path, True)
+        # Workers pull the next batch as soon as they are done with the previous
+        # one, so they are kept busy until the queue is empty, no matter how long
+        # individual files take.
+        while (batch := tasks.get()) is not None:
+            results.put(process_pdf_batch(batch))
+    finally:
+        _kill_gs()
+
+
+def _available_cpus():
+    # Only Linux lets us query and set the CPU affinity.
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+
+    return None
+
+
+def _start_gs():
+    global _gs, _gs_lines
+    _gs = subprocess.Popen(
+        [
+            _gs_bin,
+            # No `-q`: under QUIET, the PDF interpreter doesn't print its report of
+            # the errors it encountered, which is exactly what we are looking for.
+            "-sDEVICE=pdfwrite",
+            "-dNOPAUSE",
+            # Files opened via `run` are subject to SAFER's file permissions, so
+            # allow reading the PDFs in the store, and nothing else.
+            f"--permit-file-read={os.path.join(os.path.abspath(PDF_DIR), '')}",
+            # Write the PDF to stdout, which is discarded below. Unlike
+            # `/dev/null`, this also works on Windows. All messages, including
+            # the ones we print ourselves, go to stderr instead.
+            "-sOutputFile=%stdout%",
+            "-sstdout=%stderr",
+            # Extra flags to tune gs for a specific host.
+            *_extra_gs_args(),
+            # Let the PostScript VM grow larger before garbage collection kicks
+            # in, large PDFs otherwise spend a lot of time collecting.
+            "-c",
+            "30000000 setvmthreshold",
+            "-f",
+            "-",
+        ],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        # Together with an absolute path to gs, this lets `subprocess` use
+        # `posix_spawn` instead of fork + exec. Leaving file descriptors open is
+        # safe: Python creates them as non-inheritable, so the only ones gs gets
+        # are the pipes above.
+        close_fds=False,
+        # gs output is mostly ASCII, but file names and messages from broken PDFs
+        # may not be, and we don't want to depend on the locale of the CI runner.
+        # We flush explicitly after each command, so default buffering is fine.
+        encoding="utf-8",
+        errors="replace",
+    )
+    _gs_lines = queue.Queue()
+    threading.Thread(target=_pump, args=(_gs.stderr, _gs_lines), daemon=True).start()
+
+
+def _pump(stream, lines):
+    # Reading from a pipe can't time out, so this happens on a separate thread
+    # that hands the lines over through a queue. `None` marks the end of the output.
+    with stream:
+        for line in stream:
+            lines.put(line)
+
+    lines.put(None)
+
+
+def _finish_gs(timeout):
+    # pdfwrite only writes fonts and other shared resources when the output
+    # document is closed, which happens when gs quits. Errors may still be
+    # reported at that point, so its output needs to be checked as well.
+    try:
+        _gs.stdin.write("quit\n")
+        _gs.stdin.close()
+    except OSError:
+        pass
+
+    return _read_result(timeout, until_exit=True)
+
+
+def _kill_gs():
+    global _gs
+    if _gs is None:
+        return
+
+    _gs.kill()
+    _gs.wait()
+    _gs.stdin.close()
+    _gs = None
+
+
+def _ps_string(s):
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _get_workers(gs_bin):
+    global _workers
+    if _workers is not None and _workers[0] != gs_bin:
+        _stop_workers()
+
+    if _workers is None:
+        cpus = _available_cpus()
+        # gs is single-threaded, so running more than one per CPU that we may
+        # actually use only adds contention. Where the affinity is unknown, assume
+        # that half of the logical CPUs are SMT siblings.
+        num_workers = len(cpus) if cpus else max(1, (os.cpu_count() or 1) // 2)
+
+        tasks = multiprocessing.Queue()
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=_worker, args=(gs_bin, cpus[i] if cpus else None, tasks, results)
+            )
+            for i in range(num_workers)
+        ]
+
+        for process in processes:
+            process.start()
+
+        _workers = (gs_bin, tasks, results, processes)
+        atexit.register(_stop_workers)
+
+    return _workers[1:]
+
+
+def _stop_workers():
+    global _workers
+    if _workers is None:
+        return
+
+    _, tasks, _, processes = _workers
+    _workers = None
+    atexit.unregister(_stop_workers)
+
+    for _ in processes:
+        tasks.put(None)
+
+    for process in processes:
+        process.join()
+
+
+def _get_result(results, processes):
+    while True:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            # Otherwise, we would wait forever for the results of a dead worker.
+            if not all(process.is_alive() for process in processes):
+                raise RuntimeError("A gs worker exited unexpectedly")
+
+
+def _iter_pdfs(root):
+    # Unlike `Path.rglob`, this doesn't create a `Path` object and run a glob match
+    # for every single entry in the store. Like `Path.rglob`, a missing root just
+    # yields nothing.
+    if not os.path.isdir(root):
+        return
+
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(".pdf"):
+                    yield entry.path
+
+
+def _gs_version(gs_bin):
+    result = subprocess.run(
+        [gs_bin, "--version"], capture_output=True, encoding="utf-8", check=True
+    )
+    return result.stdout.strip()
 
+
+def _extra_gs_args():
+    return shlex.split(os.environ.get("GHOSTSCRIPT_ARGS", ""))
+
+
+def _cache_key(pdf_path, gs_version):
+    with open(pdf_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+
+    # Passes recorded with different flags don't say anything about the current
+    # ones, so the flags are part of the key as well.
+    config = json.dumps([CACHE_VERSION, gs_version, _extra_gs_args()])
+    return f"{config}:{digest}"
+
+
+def _load_cache():
+    try:
+        with open(CACHE_PATH, encoding="utf-8") as f:
+            return set(json.load(f))
+    except (OSError, ValueError):
+        return set()
+
+
+def _save_cache(passed):
+    with open(CACHE_PATH, "w", encoding="utf-8") as f:
+        json.dump(sorted(passed), f, indent=0)
+
+
+def _run_command(pdf_path):
+    # Errors raised while running the file are caught with `stopped`, so that
+    # they can't leave the interpreter in a broken state for the next file. This
+    # also suppresses gs's own report, so the name of the error and the command
+    # that raised it are printed instead. A file that stopped halfway may also
+    # have left operands or dictionaries behind, so both stacks are cleared.
+    return (
+        f"{{ ({_ps_string(os.path.abspath(pdf_path))}) run }} stopped {{ "
+        f"(Error: PostScript error while processing the file: ) print "
+        f"$error /errorname get =only ( in ) print $error /command get ==only "
+        f"(\\n) print }} if\n"
+        f"clear cleardictstack ({SENTINEL}\\n) print flush\n"
+    )
+
+
+def _timeout(pdf_path):
+    return max(MIN_TIMEOUT, os.path.getsize(pdf_path) / 1_000_000 * TIMEOUT_PER_MB)
+
+
+def _read_result(timeout, until_exit=False):
+    global _gs
+    lines = []
+    deadline = time.monotonic() + timeout
+
+    while True:
+        try:
+            line = _gs_lines.get(timeout=max(0, deadline - time.monotonic()))
+        except queue.Empty:
+            lines.append(f"Error: gs timed out after {timeout:.0f}s\n")
+            _kill_gs()
+            break
+
+        if line is None:
+            if until_exit and _gs.wait() == 0:
+                _gs = None
+                return True
+
+            lines.append("Error: gs exited unexpectedly\n")
+            _kill_gs()
+            break
+
+        if not until_exit and line.rstrip("\n") == SENTINEL:
+            return True
+
+        lines.append(line)
+
+        if ERROR_RE.search(line):
+            # The file has already failed, so don't wait for gs to work through
+            # the rest of it.
+            _kill_gs()
+            break
+
+    print("".join(lines))
+    return False
+
+
+def _check_with_gs(pdf_paths):
+    # Runs the files through a single gs, until the first one fails. Returns the
+    # files that passed, the one that failed (if any), and whether the output of
+    # the passing files was finalized without errors.
+    passed = []
+    pdf_path = pdf_paths[0]
+
+    # All files are sent at once, so that gs can move on to the next file without
+    # waiting for us to read the output of the previous one. Since the output of
+    # each file ends with a sentinel, failures can still be attributed to a
+    # single file.
+    try:
+        _start_gs()
+        _gs.stdin.write("".join(map(_run_command, pdf_paths)))
+        _gs.stdin.flush()
+
+        for pdf_path in pdf_paths:
+            print(f"Processing: {pdf_path}")
+            if not _read_result(_timeout(pdf_path)):
+                return passed, pdf_path, False
+
+            passed.append(pdf_path)
     except Exception as e:
         print(f"Exception processing {pdf_path}: {e}")
-        return (pdf_path, False)
+        _kill_gs()
+        return passed, pdf_path, False
+
+    return passed, None, _finish_gs(sum(map(_timeout, passed)))
+
+
+def process_pdf_batch(pdf_paths):
+    results = []
+
+    while pdf_paths:
+        passed, failed, finalized = _check_with_gs(pdf_paths)
+
+        if failed is None and finalized:
+            results.extend((pdf_path, True) for pdf_path in passed)
+            break
+
+        if failed is None and len(passed) == 1:
+            results.append((passed[0], False))
+            break
+
+        # Either gs was killed before it could finalize the output of the files
+        # that passed, or finalizing failed and we can't tell which file caused
+        # it. Check each of them again with its own gs.
+        for pdf_path in passed:
+            results.extend(process_pdf_batch([pdf_path]))
+
+        if failed is None:
+            break
+
+        results.append((failed, False))
+        pdf_paths = pdf_paths[len(passed) + 1 :]
+
+    return results
 
 
 def main():
-    pdf_dir = Path("store/")
     gs_bin = os.environ.get("GHOSTSCRIPT_BIN", "gs")
+    gs_bin = shutil.which(gs_bin) or gs_bin
 
     exception_files = [
         "validate_pdf_a4f_full_example",
     ]
 
-    pdf_files = [
-        str(file) for file in list(pdf_dir.rglob("*.pdf"))
-        if not any(exc in str(file) for exc in exception_files)
-    ]
-    
+    # A single alternation is matched in one pass, no matter how many exceptions
+    # there are.
+    skip_re = re.compile("|".join(map(re.escape, exception_files))) if exception_files else None
+
+    pdf_files = []
+    for path in _iter_pdfs(PDF_DIR):
+        if skip_re is None or not skip_re.search(path):
+            pdf_files.append(path)
 
     if not pdf_files:
         print("No PDF files found")
         return 0
 
+    try:
+        gs_version = _gs_version(gs_bin)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Failed to run {gs_bin}: {e}")
+        return 1
+
+    # Only passing files are cached, so that failing ones are checked (and their
+    # output printed) again on every run.
+    cache = _load_cache()
+    keys = {pdf: _cache_key(pdf, gs_version) for pdf in pdf_files}
+    passed = {key for key in keys.values() if key in cache}
+    pdf_files = [pdf for pdf in pdf_files if keys[pdf] not in passed]
+
+    # Start with the largest files, so that a big file picked up at the very end
+    # doesn't keep a single worker busy while all others are idle. The sorted
+    # files are dealt out to the batches round-robin: cutting them into
+    # contiguous batches would put the largest files into the same batch, and
+    # thus process them one after the other in the same gs.
+    pdf_files.sort(key=os.path.getsize, reverse=True)
+    num_batches = (len(pdf_files) + BATCH_SIZE - 1) // BATCH_SIZE
+    batches = [pdf_files[i::num_batches] for i in range(num_batches)]
+
     had_errors = False
 
-    max_workers = os.cpu_count() or 1
+    tasks, results, processes = _get_workers(gs_bin)
 
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(process_pdf, pdf, gs_bin): pdf for pdf in pdf_files}
+    for batch in batches:
+        tasks.put(batch)
 
-        for future in as_completed(futures):
-            pdf_path, success = future.result()
-            if not success:
+    for _ in batches:
+        for pdf_path, success in _get_result(results, processes):
+            if success:
+                passed.add(keys[pdf_path])
+            else:
                 had_errors = True
 
+    # Entries of files that no longer exist or changed are dropped here.
+    _save_cache(passed)
+
     return 1 if had_errors else 0
 
 
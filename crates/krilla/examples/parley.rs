@@ -63,6 +63,17 @@ fn main() {
     // We need to set up a font cache that converts from parley fonts to krilla fonts.
     let mut font_cache = HashMap::new();
 
+    // The same styles are used over and over again, so only convert them to fills once.
+    let fills = layout
+        .styles()
+        .iter()
+        .map(|style| Fill {
+            paint: style.brush.into(),
+            opacity: NormalizedF32::ONE,
+            rule: Default::default(),
+        })
+        .collect::<Vec<_>>();
+
     // The usual page setup.
     let mut document = Document::new();
     let mut page = document.start_page_with(PageSettings::from_wh(200.0, 300.0).unwrap());
@@ -72,7 +83,6 @@ fn main() {
         let y = line.metrics().baseline;
         let mut x = 0.0;
         for run in line.runs() {
-            let mut cur_x = x;
             let font = run.font().clone();
             let (font_data, id) = font.data.into_raw_parts();
             // Get the krilla font.
@@ -81,13 +91,11 @@ fn main() {
                 .or_insert_with(|| Font::new(font_data.into(), font.index).unwrap());
             let font_size = run.font_size();
 
-            // This is part is somewhat convoluted, the reason being that each glyph might
-            // have a different style than the previous one. So we always need to keep track
-            // of the current style, and whenever we encounter a new style we "flush" all
-            // current glyphs into the PDF, and build the next sequence of consecutive
-            // glyphs.
-            let mut cur_style = None;
+            // Each glyph might have a different style than the previous one. So we first
+            // collect all glyphs of the run, together with their style and x position, and
+            // then draw each sequence of consecutive glyphs with the same style at once.
             let mut glyphs = Vec::<KrillaGlyph>::new();
+            let mut placements = Vec::new();
 
             for cluster in run.visual_clusters() {
                 if cluster.is_ligature_continuation() {
@@ -99,35 +107,6 @@ fn main() {
                 }
 
                 for glyph in cluster.glyphs() {
-                    let glyph_style = glyph.style_index;
-
-                    if let Some(style) = cur_style {
-                        if style != glyph_style {
-                            // If style doesn't match, flush all glyphs up to now.
-                            cur_style = Some(glyph_style);
-                            let style = layout.styles()[style as usize].brush;
-                            surface.set_fill(Some(Fill {
-                                paint: style.into(),
-                                opacity: NormalizedF32::ONE,
-                                rule: Default::default(),
-                            }));
-
-                            surface.draw_glyphs(
-                                Point { x: cur_x, y },
-                                &glyphs,
-                                krilla_font.clone(),
-                                &text,
-                                font_size,
-                                false,
-                            );
-                            glyphs.clear();
-                            cur_x = x;
-                        }
-                    } else {
-                        cur_style = Some(glyph_style);
-                    }
-
-                    // Add the current glyph to our buffer of glyphs.
                     glyphs.push(KrillaGlyph::new(
                         GlyphId::new(glyph.id as u32),
                         glyph.advance / font_size,
@@ -137,26 +116,29 @@ fn main() {
                         cluster.text_range(),
                         None,
                     ));
+                    placements.push((glyph.style_index, x));
                     // And make sure keep track of the current x position.
                     x += glyph.advance;
                 }
             }
 
-            // Flush all remaining glyphs, if existing.
-            if !glyphs.is_empty() {
-                surface.set_fill(Some(Fill {
-                    paint: layout.styles()[cur_style.unwrap() as usize].brush.into(),
-                    opacity: NormalizedF32::ONE,
-                    rule: Default::default(),
-                }));
+            let mut start = 0;
+
+            for segment in placements.chunk_by(|(a, _), (b, _)| a == b) {
+                let (style, cur_x) = segment[0];
+                let end = start + segment.len();
+
+                surface.set_fill(Some(fills[style as usize].clone()));
                 surface.draw_glyphs(
                     Point::from_xy(cur_x, y),
-                    &glyphs,
+                    &glyphs[start..end],
                     krilla_font.clone(),
                     &text,
                     font_size,
                     false,
                 );
+
+                start = end;
             }
         }
     }
@@ -23,17 +23,11 @@ fn main() {
     let mut stream_builder = surface.stream_builder();
     let mut pattern_surface = stream_builder.surface();
 
-    pattern_surface.set_fill(Some(Fill {
-        paint: rgb::Color::new(255, 0, 0).into(),
-        ..Default::default()
-    }));
+    pattern_surface.set_fill(Some(rgb_fill(255, 0, 0)));
     // Draw the top-left rectangle.
     pattern_surface.draw_path(&rect_to_path(0.0, 0.0, 10.0, 10.0));
 
-    pattern_surface.set_fill(Some(Fill {
-        paint: rgb::Color::new(0, 0, 255).into(),
-        ..Default::default()
-    }));
+    pattern_surface.set_fill(Some(rgb_fill(0, 0, 255)));
     // Draw the bottom-right rectangle.
     pattern_surface.draw_path(&rect_to_path(10.0, 10.0, 20.0, 20.0));
     pattern_surface.finish();
@@ -91,3 +85,11 @@ pub fn rect_to_path(x1: f32, y1: f32, x2: f32, y2: f32) -> Path {
     builder.push_rect(Rect::from_ltrb(x1, y1, x2, y2).unwrap());
     builder.finish().unwrap()
 }
+
+// A simple convenience function that allow us to create a fill with a solid RGB color.
+pub fn rgb_fill(r: u8, g: u8, b: u8) -> Fill {
+    Fill {
+        paint: rgb::Color::new(r, g, b).into(),
+        ..Default::default()
+    }
+}
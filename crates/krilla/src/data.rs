@@ -3,6 +3,11 @@ use std::hash::{Hash, Hasher};
 use std::sync::Arc;
 
 /// A type that holds some bytes.
+///
+/// The bytes are reference-counted, so cloning `Data` is cheap. Since anything that
+/// implements `AsRef<[u8]>` can be wrapped, large files such as fonts can for example
+/// be passed as a memory-mapped file via `Arc<dyn AsRef<[u8]> + Send + Sync>`, instead of
+/// reading them into a `Vec` first.
 #[derive(Clone)]
 pub struct Data(pub(crate) Arc<dyn AsRef<[u8]> + Send + Sync>);
 
@@ -178,26 +178,31 @@ pub struct Transform(tiny_skia_path::Transform);
 
 impl Transform {
     /// Creates an identity transform.
+    #[inline]
     pub fn identity() -> Self {
         Self(tiny_skia_path::Transform::default())
     }
 
     /// Creates a new `Transform`.
+    #[inline]
     pub fn from_row(sx: f32, ky: f32, kx: f32, sy: f32, tx: f32, ty: f32) -> Self {
         Self(tiny_skia_path::Transform::from_row(sx, ky, kx, sy, tx, ty))
     }
 
     /// Creates a new translating `Transform`.
+    #[inline]
     pub fn from_translate(tx: f32, ty: f32) -> Self {
         Self(tiny_skia_path::Transform::from_translate(tx, ty))
     }
 
     /// Creates a new scaling `Transform`.
+    #[inline]
     pub fn from_scale(sx: f32, sy: f32) -> Self {
         Self(tiny_skia_path::Transform::from_scale(sx, sy))
     }
 
     /// Creates a new skewing `Transform`.
+    #[inline]
     pub fn from_skew(kx: f32, ky: f32) -> Self {
         Self(tiny_skia_path::Transform::from_skew(kx, ky))
     }
@@ -205,6 +210,7 @@ impl Transform {
     /// Creates a new rotating `Transform`.
     ///
     /// `angle` in degrees.
+    #[inline]
     pub fn from_rotate(angle: f32) -> Self {
         Self(tiny_skia_path::Transform::from_rotate(angle))
     }
@@ -293,6 +299,14 @@ impl Path {
     pub fn transform(self, transform: Transform) -> Option<Self> {
         Some(Self(self.0.transform(transform.to_tsp())?))
     }
+
+    /// Clear the path and return a [`PathBuilder`] that reuses its allocations.
+    ///
+    /// This is useful when drawing many paths one after another, since the
+    /// memory of the previous path can be used for the next one.
+    pub fn clear(self) -> PathBuilder {
+        PathBuilder(self.0.clear())
+    }
 }
 
 /// A path builder.
@@ -1112,6 +1112,12 @@ impl TagGroup {
     }
 }
 
+impl<N: Into<Node>> Extend<N> for TagGroup {
+    fn extend<I: IntoIterator<Item = N>>(&mut self, iter: I) {
+        self.children.extend(iter.into_iter().map(Into::into))
+    }
+}
+
 /// A tag tree.
 #[derive(Default)]
 pub struct TagTree {
@@ -1219,6 +1225,12 @@ impl TagTree {
     }
 }
 
+impl<N: Into<Node>> Extend<N> for TagTree {
+    fn extend<I: IntoIterator<Item = N>>(&mut self, iter: I) {
+        self.children.extend(iter.into_iter().map(Into::into))
+    }
+}
+
 fn serialize_children(
     sc: &mut SerializeContext,
     parent_ref: Ref,
@@ -13,7 +13,8 @@ impl NormalizedF32 {
 
     /// Create a new normalized f32.
     ///
-    /// Panics if the number is not normalized.
+    /// Returns `None` if the number is not normalized.
+    #[inline]
     pub fn new(num: f32) -> Option<Self> {
         Some(Self(tiny_skia_path::NormalizedF32::new(num)?))
     }
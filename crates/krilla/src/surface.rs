@@ -6,6 +6,8 @@
 
 use std::num::NonZeroU64;
 
+use smallvec::SmallVec;
+
 use crate::chunk_container::ChunkContainer;
 use crate::color::rgb;
 use crate::configure::validate::VersionedFeature;
@@ -75,7 +77,8 @@ pub struct Surface<'a> {
     fill: Option<Fill>,
     stroke: Option<Stroke>,
     bd: Builders,
-    push_instructions: Vec<PushInstruction>,
+    // Pushes are rarely nested deeply, so keep the stack inline in the surface.
+    push_instructions: SmallVec<[PushInstruction; 8]>,
     page_identifier: Option<PageTagIdentifier>,
     finish_fn: Box<dyn FnMut(Stream, i32) + 'a>,
 }
@@ -95,7 +98,7 @@ impl<'a> Surface<'a> {
             page_identifier,
             fill: None,
             stroke: None,
-            push_instructions: vec![],
+            push_instructions: SmallVec::new(),
             finish_fn,
         }
     }
@@ -245,16 +248,17 @@ impl<'a> Surface<'a> {
         font_size: f32,
     ) {
         let (mut cur_x, y) = (start.x, start.y);
+        let scale = tiny_skia_path::Transform::from_scale(
+            font_size / font.units_per_em(),
+            -font_size / font.units_per_em(),
+        );
 
         for glyph in glyphs {
-            let mut base_transform = tiny_skia_path::Transform::from_translate(
+            let base_transform = tiny_skia_path::Transform::from_translate(
                 cur_x + glyph.x_offset(font_size),
                 y - glyph.y_offset(font_size),
-            );
-            base_transform = base_transform.pre_concat(tiny_skia_path::Transform::from_scale(
-                font_size / font.units_per_em(),
-                -font_size / font.units_per_em(),
-            ));
+            )
+            .pre_concat(scale);
             draw_glyph(
                 font.clone(),
                 context_color,
@@ -410,16 +414,28 @@ impl<'a> Surface<'a> {
 
     /// Concatenate a new transform to the current transformation matrix.
     pub fn push_transform(&mut self, transform: &Transform) {
-        self.push_instructions.push(PushInstruction::Transform);
-        self.bd.get_mut().save_graphics_state();
-        self.bd.get_mut().concat_transform(transform);
+        let saved = *transform != Transform::identity();
+        self.push_instructions
+            .push(PushInstruction::Transform { saved });
+
+        if saved {
+            self.bd.get_mut().save_graphics_state();
+            self.bd.get_mut().concat_transform(transform);
+        }
     }
 
     /// Push a new blend mode.
     pub fn push_blend_mode(&mut self, blend_mode: BlendMode) {
-        self.push_instructions.push(PushInstruction::BlendMode);
-        self.bd.get_mut().save_graphics_state();
-        self.bd.get_mut().set_blend_mode(blend_mode.to_pdf());
+        // Like in `ContentBuilder::set_blend_mode`, the normal blend mode doesn't change
+        // the graphics state, so there is no need to save it.
+        let saved = blend_mode != BlendMode::Normal;
+        self.push_instructions
+            .push(PushInstruction::BlendMode { saved });
+
+        if saved {
+            self.bd.get_mut().save_graphics_state();
+            self.bd.get_mut().set_blend_mode(blend_mode.to_pdf());
+        }
     }
 
     /// Push a new clip path.
@@ -496,9 +512,19 @@ impl<'a> Surface<'a> {
     ///
     /// # Panics
     /// Panics if the there wasn't a corresponding `push` to the `pop`.
+    #[track_caller]
     pub fn pop(&mut self) {
-        match self.push_instructions.pop().unwrap() {
-            PushInstruction::Transform => self.bd.get_mut().restore_graphics_state(),
+        let instruction = self
+            .push_instructions
+            .pop()
+            .expect("attempted to pop without a corresponding push");
+
+        match instruction {
+            PushInstruction::Transform { saved } => {
+                if saved {
+                    self.bd.get_mut().restore_graphics_state();
+                }
+            }
             PushInstruction::Opacity(o) => {
                 if o != NormalizedF32::ONE {
                     let stream = self.bd.sub_builders.pop().unwrap().finish(self.sc);
@@ -508,7 +534,11 @@ impl<'a> Surface<'a> {
                 }
             }
             PushInstruction::ClipPath => self.bd.get_mut().pop_clip_path(),
-            PushInstruction::BlendMode => self.bd.get_mut().restore_graphics_state(),
+            PushInstruction::BlendMode { saved } => {
+                if saved {
+                    self.bd.get_mut().restore_graphics_state();
+                }
+            }
             PushInstruction::Mask(mask) => {
                 let stream = self.bd.sub_builders.pop().unwrap().finish(self.sc);
                 self.bd
@@ -655,10 +685,16 @@ impl Builders {
 }
 
 pub(crate) enum PushInstruction {
-    Transform,
+    Transform {
+        /// Whether the graphics state was saved and needs to be restored.
+        saved: bool,
+    },
     Opacity(NormalizedF32),
     ClipPath,
-    BlendMode,
+    BlendMode {
+        /// Whether the graphics state was saved and needs to be restored.
+        saved: bool,
+    },
     Mask(Box<Mask>),
     Isolated,
 }
@@ -1,10 +1,26 @@
+use std::cell::Cell;
+
 use crate::text::Font;
 use crate::text::{GlyphId, KrillaGlyph};
 use harfrust::{Direction, ShapeOptions, UnicodeBuffer};
 
+// Only buffers used for texts up to this length (in bytes) are kept around, so
+// that shaping a single huge text doesn't pin its allocation for the rest of the
+// thread's lifetime.
+const MAX_CACHED_TEXT_LEN: usize = 4096;
+
+thread_local! {
+    // The buffer of the previous shaping call, so that its allocations can be reused.
+    static BUFFER: Cell<Option<UnicodeBuffer>> = const { Cell::new(None) };
+}
+
 /// Naively shape some text with a single font.
 pub(crate) fn naive_shape(text: &str, font: Font, direction: TextDirection) -> Vec<KrillaGlyph> {
-    let mut buffer = UnicodeBuffer::new();
+    let cache = text.len() <= MAX_CACHED_TEXT_LEN;
+    let mut buffer = cache
+        .then(|| BUFFER.take())
+        .flatten()
+        .unwrap_or_else(UnicodeBuffer::new);
     buffer.push_str(text);
     buffer.guess_segment_properties();
 
@@ -23,58 +39,52 @@ pub(crate) fn naive_shape(text: &str, font: Font, direction: TextDirection) -> V
     let positions = output.glyph_positions();
     let infos = output.glyph_infos();
 
-    let mut glyphs = vec![];
-
-    for i in 0..output.len() {
-        let pos = positions[i];
-        let start_info = infos[i];
-
-        let start = start_info.cluster as usize;
+    // The text range of a glyph ends where the cluster following it in logical
+    // order starts. Determine that once for all glyphs, instead of scanning
+    // ahead from each glyph, which is quadratic for long clusters.
+    let mut ends = vec![text.len(); infos.len()];
+    let mut end = text.len();
 
-        let end = if dir == Direction::LeftToRight || dir == Direction::TopToBottom {
-            let mut e = i.checked_add(1);
-            loop {
-                if let Some(index) = e {
-                    if let Some(end_info) = infos.get(index) {
-                        if end_info.cluster == start_info.cluster {
-                            e = index.checked_add(1);
-                            continue;
-                        }
-                    }
-                }
+    if dir == Direction::LeftToRight || dir == Direction::TopToBottom {
+        for (i, info) in infos.iter().enumerate().rev() {
+            ends[i] = end;
 
-                break;
+            if i == 0 || infos[i - 1].cluster != info.cluster {
+                end = info.cluster as usize;
             }
+        }
+    } else {
+        for (i, info) in infos.iter().enumerate() {
+            ends[i] = end;
 
-            e
-        } else {
-            let mut e = i.checked_sub(1);
-            while let Some(index) = e {
-                if let Some(end_info) = infos.get(index) {
-                    if end_info.cluster == start_info.cluster {
-                        e = index.checked_sub(1);
-                    } else {
-                        break;
-                    }
-                }
+            if infos
+                .get(i + 1)
+                .is_none_or(|next| next.cluster != info.cluster)
+            {
+                end = info.cluster as usize;
             }
-
-            e
         }
-        .and_then(|last| infos.get(last))
-        .map_or(text.len(), |info| info.cluster as usize);
+    }
 
+    let units_per_em = font.units_per_em();
+    let mut glyphs = Vec::with_capacity(infos.len());
+
+    for ((pos, info), end) in positions.iter().zip(infos).zip(ends) {
         glyphs.push(KrillaGlyph::new(
-            GlyphId::new(start_info.glyph_id),
-            pos.x_advance as f32 / font.units_per_em(),
-            pos.x_offset as f32 / font.units_per_em(),
-            pos.y_offset as f32 / font.units_per_em(),
-            pos.y_advance as f32 / font.units_per_em(),
-            start..end,
+            GlyphId::new(info.glyph_id),
+            pos.x_advance as f32 / units_per_em,
+            pos.x_offset as f32 / units_per_em,
+            pos.y_offset as f32 / units_per_em,
+            pos.y_advance as f32 / units_per_em,
+            info.cluster as usize..end,
             None,
         ));
     }
 
+    if cache {
+        BUFFER.set(Some(output.clear()));
+    }
+
     glyphs
 }
 
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import argparse
+import os
 import re
 import shutil
 
@@ -195,29 +196,39 @@ def sync_resvg_fonts(resvg_fonts_dir):
     return copied, updated
 
 
+def svg_test_names():
+    # Unlike `Path.glob`, this doesn't create a `Path` object and run a glob match
+    # for every single SVG.
+    with os.scandir(SVG_DIR) as it:
+        return sorted(entry.name for entry in it if entry.name.endswith(".svg"))
+
+
 def write_generated_tests():
-    test_string = f"// This file was auto-generated by `{Path(__file__).name}`, do not edit manually.\n\n"
+    parts = [f"// This file was auto-generated by `{Path(__file__).name}`, do not edit manually.\n\n"]
 
-    for p in sorted(SVG_DIR.glob("*.svg")):
-        if p.name in MANUAL_TESTS:
+    for name in svg_test_names():
+        if name in MANUAL_TESTS:
             continue
 
         attrs = ["svg"]
 
-        ignore_reason = ignored_test_reason(p.name)
+        ignore_reason = ignored_test_reason(name)
         if ignore_reason is not None:
-            test_string += f"// {ignore_reason}\n"
+            parts.append(f"// {ignore_reason}\n")
             attrs.append("ignore")
 
-        if str(p.name) in ADDITIONAL_ATTRS:
-            attrs.extend(ADDITIONAL_ATTRS[str(p.name)])
-        
-        test_string += f"#[visreg({', '.join(attrs)})] "
-        
-        test_string += f'fn {p.stem}() {{}}\n'
+        attrs.extend(ADDITIONAL_ATTRS.get(name, []))
+
+        parts.append(f"#[visreg({', '.join(attrs)})] fn {name.removesuffix('.svg')}() {{}}\n")
+
+    test_string = "".join(parts)
+
+    # Leave the file untouched if nothing changed, so that cargo doesn't rebuild
+    # the tests.
+    if OUT_PATH.exists() and OUT_PATH.read_text() == test_string:
+        return
 
-    with open(Path(OUT_PATH), "w") as file:
-        file.write(test_string)
+    OUT_PATH.write_text(test_string)
 
 
 def main():
@@ -95,3 +95,12 @@ fn page_media_box_bottom_right(d: &mut Document) {
 fn page_media_box_zoomed_out(d: &mut Document) {
     media_box_impl(d, Rect::from_xywh(-150.0, -200.0, 500.0, 500.0).unwrap())
 }
+
+#[test]
+#[should_panic(expected = "attempted to pop without a corresponding push")]
+fn page_surface_pop_without_push() {
+    let mut document = Document::new();
+    let mut page = document.start_page();
+    let mut surface = page.surface();
+    surface.pop();
+}
@@ -1,5 +1,7 @@
+use krilla::geom::{Path, PathBuilder};
 use krilla::page::Page;
 use krilla::surface::Surface;
+use krilla::Document;
 use krilla_macros::{snapshot, visreg};
 
 use crate::{cmyk_fill, gray_fill, rect_to_path, red_fill};
@@ -55,3 +57,34 @@ fn path_with_cmyk_icc(surface: &mut Surface) {
     surface.set_fill(Some(cmyk_fill(1.0)));
     surface.draw_path(&path);
 }
+
+fn triangle(mut builder: PathBuilder) -> Path {
+    builder.move_to(20.0, 180.0);
+    builder.line_to(100.0, 20.0);
+    builder.line_to(180.0, 180.0);
+    builder.close();
+
+    builder.finish().unwrap()
+}
+
+fn path_document(path: &Path) -> Vec<u8> {
+    let mut document = Document::new();
+    let mut page = document.start_page();
+    let mut surface = page.surface();
+    surface.set_fill(Some(red_fill(1.0)));
+    surface.draw_path(path);
+    surface.finish();
+    page.finish();
+
+    document.finish().unwrap()
+}
+
+#[test]
+fn path_clear_reuses_builder() {
+    let rect = rect_to_path(20.0, 20.0, 180.0, 180.0);
+    let reused = triangle(rect.clear());
+    let fresh = triangle(PathBuilder::new());
+
+    // The rectangle must not leave any segments behind in the second path.
+    assert_eq!(path_document(&reused), path_document(&fresh));
+}
@@ -821,3 +821,23 @@ fn tagging_missing_identifier_in_tree() {
 
     let _ = document.finish();
 }
+
+#[test]
+fn tagging_extend() {
+    let children = || vec![TagGroup::new(Tag::P), TagGroup::new(Tag::Span)];
+
+    let mut pushed_group = TagGroup::new(Tag::Section);
+    let mut pushed_tree = TagTree::new();
+    for child in children() {
+        pushed_group.push(child.clone());
+        pushed_tree.push(child);
+    }
+
+    let mut extended_group = TagGroup::new(Tag::Section);
+    extended_group.extend(children());
+    let mut extended_tree = TagTree::new();
+    extended_tree.extend(children());
+
+    assert_eq!(extended_group, pushed_group);
+    assert_eq!(extended_tree.children, pushed_tree.children);
+}